@@ -1,11 +1,17 @@
 # upgraded_attendance_ui.py
 # Full upgraded UI wrapper around your existing attendance logic.
-# Preserves all original scan / registration / attendance functions unchanged.
+# Scanning, registration and attendance logic run on worker threads; the Tk UI only drains their results.
 
-import pandas as pd
+import csv
 import datetime
+import hashlib
+import hmac
+import io
 import json
 import os
+import queue
+import random
+import sys
 import time
 import tkinter as tk
 from tkinter import messagebox, scrolledtext, simpledialog, ttk
@@ -20,16 +26,44 @@ except ImportError:
     BLUETOOTH_AVAILABLE = False
     print("Warning: 'pybluez' is not installed. Bluetooth functionality will be simulated.")
 
-# --- Configuration (kept original values; modify if needed) ---
-SCAN_DURATION_SECONDS = 5
-SCAN_INTERVAL_SECONDS = 5
+# --- Fast JSON (optional orjson, falls back to stdlib json) ---
+# orjson only supports 2-space indentation; the stdlib fallback keeps the original indent=4.
+try:
+    import orjson
+
+    def _json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj, indent=4).encode("utf-8")
+
+    _json_loads = json.loads
+
+# --- Configuration (modify if needed) ---
+SCAN_DURATION_SECONDS = 5  # registration scan
+# Attendance scan presets: name -> (scan duration, wait between scans), in seconds.
+# Bluetooth inquiry runs in 1.28 s slots, so durations are multiples of 1.28.
+SCAN_PROFILES = {
+    "Low Latency": (1.28, 2.56),
+    "Balanced": (2.56, 2.56),
+    "Low Power": (5.12, 10.24),
+}
+DEFAULT_SCAN_PROFILE = "Balanced"
+INQUIRY_SLOT_SECONDS = 1.28
 REGISTRATION_FILE = "registered_students.json"
+ATTENDANCE_CSV = "attendance.csv"  # one row per student per session, appended after each session
 ATTENDANCE_THRESHOLD = 0.8
+SIMULATION_DROP_RATE = 0.1  # chance a simulated device is missed during an attendance scan
+REPORT_COLUMNS = ['Name', 'Beacon ID', 'Date', 'Status', 'Total Detections', 'Total Scans', 'Required Detections']
 
 # --- Default UI / Auth settings (change here if you wish) ---
 DEFAULT_TEACHER_ID = "teacher"
 DEFAULT_TEACHER_PASSWORD = "1234"
 STUDENT_ADMIN_PASSWORD = "admin123"
+_TEACHER_PASSWORD_HASH = hashlib.sha256(DEFAULT_TEACHER_PASSWORD.encode()).digest()
+_ADMIN_PASSWORD_HASH = hashlib.sha256(STUDENT_ADMIN_PASSWORD.encode()).digest()
 
 BATCHES = ["CSE A", "CSE B", "IT A", "ECE 1"]
 PERIODS = [f"Period {i}" for i in range(1, 7)]  # 6 periods by default
@@ -38,26 +72,30 @@ SEMESTERS = [str(i) for i in range(1, 9)]
 # --- Data stores (same as original) ---
 registered_students = {}
 attendance_data = {}
-attendance_records = {}
 
 # --- Global UI / State placeholders ---
 app = None
 log_box = None
-current_teacher_context = {"batch": None, "period": None, "semester": None}
+_screen_width = _screen_height = None  # cached once in setup_ui
+current_teacher_context = {"batch": None, "period": None, "semester": None, "scan_profile": DEFAULT_SCAN_PROFILE}
 is_scanning = False
+is_registering = False  # registration scan in progress (set/cleared on the UI thread)
 stop_scan_flag = threading.Event()
+_log_queue = queue.Queue()  # drained into log_box by the UI thread (see setup_ui)
 
-# ---------- Original helper & logic functions (kept intact, slightly adapted to reference globals) ----------
+# ---------- Helper & logic functions ----------
 
 def log(message):
-    """Console + UI log helper."""
-    print(message)
-    if log_box:
-        log_box.after(0, lambda: log_box.insert(tk.END, message + "\n"))
-        log_box.after(0, lambda: log_box.see(tk.END))
-
-def scan_for_devices(duration):
-    """Scans for Bluetooth devices or simulates when pybluez not present."""
+    """Console + UI log helper (console output is flushed by the UI drain in setup_ui)."""
+    if sys.stdout:  # None under pythonw
+        sys.stdout.write(message + "\n")
+    _log_queue.put(message)
+
+def scan_for_devices(duration, stop_event=None):
+    """Scans for Bluetooth devices or simulates when pybluez not present.
+
+    stop_event (optional threading.Event) makes the simulated wait interruptible.
+    """
     devices_found = {}
     if not BLUETOOTH_AVAILABLE:
         log("\n⚠️ SIMULATION MODE: Bluetooth module not found.")
@@ -65,16 +103,22 @@ def scan_for_devices(duration):
         if len(simulated_macs) < 2:
             simulated_macs.append("AA:BB:CC:DD:EE:01")
             simulated_macs.append("AA:BB:CC:DD:EE:02")
+        students = registered_students
         for mac in simulated_macs:
-            name = registered_students.get(mac, {}).get('name', 'Unknown Device')
+            name = students[mac]['name'] if mac in students else 'Unknown Device'
             # slight randomness in simulated detection to mimic real world
-            if threading.current_thread().name == "MainThread" or (time.time() * 1000) % 4 != 0:
+            # only attendance scans drop devices; registration always sees every simulated device
+            if threading.current_thread().name != "AttendanceThread" or random.random() >= SIMULATION_DROP_RATE:
                 devices_found[mac] = {'name': name, 'rssi': 'N/A'}
-        time.sleep(duration / 2)
+        if stop_event is not None:
+            stop_event.wait(duration / 2)  # interruptible, so Stop takes effect immediately
+        else:
+            time.sleep(duration / 2)
         return devices_found
 
     try:
-        nearby_devices = bluetooth.discover_devices(duration=duration, lookup_names=True, flush_cache=True, lookup_class=False)
+        inquiry_slots = max(1, round(duration / INQUIRY_SLOT_SECONDS))  # pybluez takes duration in 1.28 s units
+        nearby_devices = bluetooth.discover_devices(duration=inquiry_slots, lookup_names=True, flush_cache=True, lookup_class=False)
         for addr, name in nearby_devices:
             devices_found[addr] = {'name': name if name else "Unknown Device", 'rssi': 'N/A'}
     except Exception as e:
@@ -87,8 +131,8 @@ def load_registered_students():
     global registered_students
     if os.path.exists(REGISTRATION_FILE):
         try:
-            with open(REGISTRATION_FILE, 'r') as f:
-                registered_students = json.load(f)
+            with open(REGISTRATION_FILE, 'rb') as f:
+                registered_students = _json_loads(f.read())
                 log(f"✅ Loaded {len(registered_students)} registered students from {REGISTRATION_FILE}.")
         except (IOError, json.JSONDecodeError) as e:
             log(f"❌ Error loading student data from file: {e}. Starting with an empty list.")
@@ -97,24 +141,64 @@ def load_registered_students():
         log("No existing registration file found. Starting a new registration.")
 
 def save_registered_students():
-    """Save to JSON."""
+    """Save to JSON (written to a temp file, then atomically renamed into place)."""
+    tmp_file = REGISTRATION_FILE + ".tmp"
     try:
-        with open(REGISTRATION_FILE, 'w') as f:
-            json.dump(registered_students, f, indent=4)
+        with open(tmp_file, 'wb') as f:
+            f.write(_json_dumps(registered_students))
+        os.replace(tmp_file, REGISTRATION_FILE)
         log(f"✅ Registered students saved to {REGISTRATION_FILE}.")
     except IOError as e:
         log(f"❌ Error saving student data to file: {e}")
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
 
-# --- Registration popup (reused from original) ---
+# --- Registration: background scan, then device picker popup ---
 def registration_process_popup():
-    """Handles student registration flow (reuses original logic)."""
+    """Handles student registration flow: scans on a worker thread, then shows the device list."""
+    global is_registering
+    if is_registering:
+        messagebox.showwarning("Warning", "A registration scan is already running.")
+        return
+    if is_scanning:
+        messagebox.showwarning("Warning", "Stop the attendance session before registering students.")
+        return
+    is_registering = True
+    log("\n--- 📝 Starting Student Registration Scan ---")
+    app.config(cursor="wait")
+    result_queue = queue.Queue()
+
+    def do_scan():
+        nearby_devices = {}
+        try:
+            nearby_devices = scan_for_devices(SCAN_DURATION_SECONDS)
+        finally:
+            result_queue.put(nearby_devices)
+
+    def poll_scan():
+        global is_registering
+        try:
+            nearby_devices = result_queue.get_nowait()
+        except queue.Empty:
+            app.after(100, poll_scan)
+            return
+        is_registering = False
+        app.config(cursor="")
+        show_registration_devices(nearby_devices)
+
+    threading.Thread(target=do_scan, name="RegistrationThread", daemon=True).start()
+    app.after(100, poll_scan)
+
+def show_registration_devices(nearby_devices):
+    """Lists scanned devices and registers the selected one under a student name."""
     def register_selected():
-        selected_index = listbox.curselection()
-        if not selected_index:
+        selection = tree.selection()
+        if not selection:
             messagebox.showerror("Error", "Please select a device to register.")
             return
-        index = selected_index[0]
-        selected_mac, selected_data = device_list[index]
+        selected_mac = selection[0]  # row iid is the MAC address
         name = name_entry.get().strip()
         if not name:
             messagebox.showerror("Error", "Student name cannot be empty.")
@@ -128,30 +212,27 @@ def registration_process_popup():
         save_registered_students()
         devices_window.destroy()
 
-    log("\n--- 📝 Starting Student Registration Scan (Blocking) ---")
-    app.config(cursor="wait")
-    app.update_idletasks()
-    nearby_devices = scan_for_devices(SCAN_DURATION_SECONDS)
-    app.config(cursor="")
-    app.update_idletasks()
-
     if not nearby_devices:
         log("⚠️ No Bluetooth devices found. Registration aborted.")
         messagebox.showinfo("Registration Status", "No Bluetooth devices found.")
         return
 
-    device_list = list(nearby_devices.items())
     devices_window = tk.Toplevel(app)
     devices_window.title("Register Student")
     devices_window.geometry("520x380")
     devices_window.resizable(False, False)
 
     tk.Label(devices_window, text="Found Devices:", font=('Segoe UI', 10, 'bold')).pack(pady=8)
-    listbox = tk.Listbox(devices_window, width=70, height=10, font=('Consolas', 10))
-    for mac, data in device_list:
-        status = "(Registered)" if mac in registered_students else ""
-        listbox.insert(tk.END, f"{data['name']} | MAC: {mac} {status}")
-    listbox.pack(pady=4, padx=8)
+    tree = ttk.Treeview(devices_window, columns=('name', 'mac', 'status'), show='headings', height=10, selectmode='browse')
+    tree.heading('name', text="Name")
+    tree.heading('mac', text="MAC Address")
+    tree.heading('status', text="Status")
+    tree.column('name', width=200)
+    tree.column('mac', width=170)
+    tree.column('status', width=100)
+    for mac, data in nearby_devices.items():
+        tree.insert('', tk.END, iid=mac, values=(data['name'], mac, "Registered" if mac in registered_students else ""))
+    tree.pack(pady=4, padx=8)
 
     tk.Label(devices_window, text="Student Name:", font=('Segoe UI', 10)).pack(pady=(8, 2))
     name_entry = tk.Entry(devices_window, width=40, font=('Segoe UI', 10))
@@ -166,11 +247,10 @@ def registration_process_popup():
     devices_window.grab_set()
     app.wait_window(devices_window)
 
-# --- Attendance core logic (unchanged - only small refactor so UI can call it) ---
+# --- Attendance core logic (runs on AttendanceThread) ---
 def attendance_process_logic():
-    global is_scanning, attendance_data, attendance_records, stop_scan_flag
+    global is_scanning, attendance_data, stop_scan_flag
     is_scanning = True
-    stop_scan_flag.clear()
     if not registered_students:
         log("\n⚠️ No students are registered. Please run registration first.")
         is_scanning = False
@@ -178,36 +258,46 @@ def attendance_process_logic():
         return
 
     log(f"\n--- ⏳ Starting Continuous Attendance Session ---")
-    log(f"System will scan every {SCAN_INTERVAL_SECONDS} seconds until stopped.")
-    attendance_records = {mac: 0 for mac in registered_students.keys()}
+    profile = current_teacher_context['scan_profile']
+    scan_duration, scan_interval = SCAN_PROFILES[profile]
+    log(f"Scan profile: {profile}. System will scan every {scan_interval} seconds until stopped.")
+    # Snapshot the roster once so the scan loop works on locals, not global dict views.
+    # Counts are kept as a flat array indexed by roster position (mac_to_idx maps into it).
+    student_items = tuple(registered_students.items())
+    registered_macs = frozenset(mac for mac, _ in student_items)
+    mac_to_idx = {mac: i for i, (mac, _) in enumerate(student_items)}
+    detections = [0] * len(student_items)
     scan_count = 0
 
     while not stop_scan_flag.is_set():
         scan_count += 1
-        log(f"\n[SCAN {scan_count}] Scanning for {SCAN_DURATION_SECONDS} seconds...")
-        nearby_devices = scan_for_devices(SCAN_DURATION_SECONDS)
-        detected_macs = set(nearby_devices.keys())
-
-        for mac in registered_students.keys():
-            student_name = registered_students[mac]['name']
-            if mac in detected_macs:
-                attendance_records[mac] += 1
-                log(f"  ✅ Detected: {student_name} (Total Detections: {attendance_records[mac]})")
-            else:
-                log(f"  ❌ Not Found: {student_name}")
-
-        log(f"Waiting for {SCAN_INTERVAL_SECONDS} seconds...")
-        if stop_scan_flag.wait(SCAN_INTERVAL_SECONDS):
+        log(f"\n[SCAN {scan_count}] Scanning for {scan_duration} seconds...")
+        nearby_devices = scan_for_devices(scan_duration, stop_scan_flag)
+        detected_macs = set(nearby_devices)
+
+        # Set ops instead of a per-student membership loop; one log() call per scan.
+        present = detected_macs & registered_macs
+        for mac in present:
+            detections[mac_to_idx[mac]] += 1
+        lines = [
+            f"  ✅ Detected: {data['name']} (Total Detections: {detections[i]})" if mac in present
+            else f"  ❌ Not Found: {data['name']}"
+            for i, (mac, data) in enumerate(student_items)
+        ]
+        if lines:
+            log("\n".join(lines))
+
+        log(f"Waiting for {scan_interval} seconds...")
+        if stop_scan_flag.wait(scan_interval):
             break
 
     log("\n\n--- 🛑 Attendance Session Stopped ---")
     current_date = datetime.date.today().isoformat()
     required_detections = round(scan_count * ATTENDANCE_THRESHOLD)
 
-    for mac, data in registered_students.items():
-        total_detections = attendance_records.get(mac, 0)
+    for (mac, data), total_detections in zip(student_items, detections):
         status = "Present" if total_detections >= required_detections else "Absent"
-        attendance_data[data['name']] = {
+        attendance_data[mac] = {
             "Name": data['name'],
             "Beacon ID": data['beacon_id'],
             "Date": current_date,
@@ -227,10 +317,16 @@ def start_attendance_session_thread():
     if is_scanning:
         messagebox.showwarning("Warning", "Attendance scan is already running.")
         return
+    if is_registering:
+        messagebox.showwarning("Warning", "Wait for the registration scan to finish before starting attendance.")
+        return
     if not BLUETOOTH_AVAILABLE:
         if not messagebox.askyesno("Warning: Simulation Mode", "Bluetooth module (pybluez) not found. The system will run in simulation mode. Continue?"):
             return
     update_ui_state(False)
+    # Claim the adapter and reset Stop before the worker starts, so an early Stop is never lost.
+    is_scanning = True
+    stop_scan_flag.clear()
     scan_thread = threading.Thread(target=attendance_process_logic, name="AttendanceThread")
     scan_thread.daemon = True
     scan_thread.start()
@@ -247,22 +343,31 @@ def display_and_export_results():
     if not attendance_data:
         log("No attendance data to display.")
         return
-    df = pd.DataFrame(list(attendance_data.values()))
-    df = df[['Name', 'Beacon ID', 'Date', 'Status', 'Total Detections', 'Total Scans', 'Required Detections']]
+    rows = list(attendance_data.values())
     log("\n--- 📊 Final Attendance Report ---")
-    log(df.to_string(index=False))
-    filename = f"attendance_{datetime.date.today().isoformat()}.csv"
+    widths = [max(len(col), *(len(str(row[col])) for row in rows)) for col in REPORT_COLUMNS]
+    fmt = " ".join(f"{{:>{w}}}" for w in widths)
+    log("\n".join([fmt.format(*REPORT_COLUMNS)] + [fmt.format(*(row[col] for col in REPORT_COLUMNS)) for row in rows]))
+    # Format the whole session first so a failure can't leave a partial append behind.
+    write_header = not os.path.exists(ATTENDANCE_CSV)
+    buffer = io.StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=REPORT_COLUMNS)
+    if write_header:
+        writer.writeheader()
+    writer.writerows(rows)
     try:
-        df.to_csv(filename, index=False)
-        log(f"\n✅ Attendance data saved to {filename}")
-    except IOError as e:
+        data = buffer.getvalue().encode('utf-8')
+        with open(ATTENDANCE_CSV, 'ab') as f:
+            f.write(data)
+        log(f"\n✅ Attendance data appended to {ATTENDANCE_CSV}")
+    except (OSError, UnicodeError) as e:
         log(f"❌ Error saving attendance file: {e}")
 
 # ---------- UI helpers & flows for app-like interface ----------
 
 def center_window(win, w=900, h=650):
-    sw = win.winfo_screenwidth()
-    sh = win.winfo_screenheight()
+    sw = _screen_width or win.winfo_screenwidth()
+    sh = _screen_height or win.winfo_screenheight()
     x = int((sw - w) / 2)
     y = int((sh - h) / 2)
     win.geometry(f"{w}x{h}+{x}+{y}")
@@ -281,12 +386,16 @@ def clear_main_area():
 
 # --- Authentication flows ---
 
+def check_password(candidate, expected_hash):
+    """Constant-time comparison of a password against a stored SHA-256 digest."""
+    return hmac.compare_digest(hashlib.sha256(candidate.encode()).digest(), expected_hash)
+
 def student_admin_auth_and_open_register():
     """Show a simple password prompt for student admin, then open register if correct."""
     pwd = simpledialog.askstring("Student Admin Auth", "Enter Admin Password:", show='*', parent=app)
     if pwd is None:
         return
-    if pwd == STUDENT_ADMIN_PASSWORD:
+    if check_password(pwd, _ADMIN_PASSWORD_HASH):
         registration_process_popup()
     else:
         messagebox.showerror("Auth Failed", "Incorrect admin password for registration.")
@@ -317,7 +426,7 @@ def teacher_login_flow():
         if not tid or not tpwd:
             messagebox.showwarning("Missing", "Please enter ID and password.")
             return
-        if tid == DEFAULT_TEACHER_ID and tpwd == DEFAULT_TEACHER_PASSWORD:
+        if tid == DEFAULT_TEACHER_ID and check_password(tpwd, _TEACHER_PASSWORD_HASH):
             login_win.destroy()
             show_teacher_selections()
         else:
@@ -373,6 +482,15 @@ def show_teacher_control_panel():
     tk.Label(ctx_frame, text=f"Batch: {current_teacher_context['batch']}", font=('Segoe UI', 11), bg='#FFFFFF').grid(row=1, column=0, sticky='w', padx=6, pady=4)
     tk.Label(ctx_frame, text=f"Period: {current_teacher_context['period']}", font=('Segoe UI', 11), bg='#FFFFFF').grid(row=2, column=0, sticky='w', padx=6, pady=4)
 
+    tk.Label(ctx_frame, text="Scan Profile:", font=('Segoe UI', 11), bg='#FFFFFF').grid(row=3, column=0, sticky='w', padx=6, pady=4)
+    profile_combo = ttk.Combobox(ctx_frame, values=list(SCAN_PROFILES), state='readonly', width=14, font=('Segoe UI', 10))
+    profile_combo.grid(row=3, column=1, sticky='w', padx=6, pady=4)
+    profile_combo.set(current_teacher_context['scan_profile'])
+
+    def on_profile_selected(event):
+        current_teacher_context['scan_profile'] = profile_combo.get()
+    profile_combo.bind("<<ComboboxSelected>>", on_profile_selected)
+
     btn_frame = tk.Frame(main_area, bg='#F5F5F5')
     btn_frame.pack(pady=12)
 
@@ -422,8 +540,9 @@ def update_ui_state(enable_register_button):
     pass
 
 def setup_ui():
-    global app, log_box, main_area
+    global app, log_box, main_area, _screen_width, _screen_height
     app = tk.Tk()
+    _screen_width, _screen_height = app.winfo_screenwidth(), app.winfo_screenheight()
     app.title("Bluetooth Attendance System — App UI")
     app.configure(bg='#F5F5F5')
     center_window(app, w=920, h=700)
@@ -447,6 +566,23 @@ def setup_ui():
     log_box = scrolledtext.ScrolledText(log_frame, wrap=tk.WORD, width=48, height=24, font=('Consolas', 10))
     log_box.pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
 
+    def drain_log_queue():
+        """Flush queued log messages into log_box with a single insert + autoscroll."""
+        items = []
+        try:
+            while True:
+                items.append(_log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if items:
+            log_box.insert(tk.END, "\n".join(items) + "\n")
+            log_box.see(tk.END)
+            if sys.stdout:
+                sys.stdout.flush()
+        app.after(100, drain_log_queue)
+
+    app.after(100, drain_log_queue)
+
     # Load data & show home
     load_registered_students()
     if not BLUETOOTH_AVAILABLE: